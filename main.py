@@ -1,25 +1,203 @@
 import os
-import json
+import re
+import orjson
+import time
+import random
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Dict, Any, Optional
+import httpx
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+import tiktoken
+from openai import AsyncOpenAI, RateLimitError
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Records go through an in-memory queue and a listener
+# thread does the stream I/O, so logger calls never block the event loop.
+log_queue = queue.Queue(-1)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, _stream_handler)
+log_listener.start()
 logger = logging.getLogger(__name__)
 
+# Created per worker process in the lifespan handler so each worker gets its
+# own connection pool bound to its own (uvloop) event loop.
+http_client = None
+client = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client, client
+    # Shared connection pool for all OpenAI traffic. HTTP/2 multiplexes
+    # concurrent streams over one TCP+TLS connection, and explicit pool limits
+    # keep keep-alive sessions warm under fan-out instead of re-handshaking.
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        http2=True,
+        # Granular timeouts so a slow OpenAI incident can't hold connections
+        # open indefinitely and exhaust the pool.
+        timeout=httpx.Timeout(connect=5, read=30, write=10, pool=5)
+    )
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_KEY"), http_client=http_client)
+    yield
+    await http_client.aclose()
+    log_listener.stop()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+ANALYSIS_MODEL = "gpt-4-0125-preview"
+VERDICT_MODEL = "gpt-4o-mini"
+
+VERDICT_SYSTEM_PROMPT = "You are a trading advisor that provides clear, decisive trading verdicts based on news analysis."
+CONTEXT_SYSTEM_PROMPT = "You are a market analyst providing context and correlation analysis for trading instruments."
+
+# Encoder cached at module scope; encoding_for_model is expensive to rebuild
+encoding = tiktoken.encoding_for_model(ANALYSIS_MODEL)
+
+class TokenBucketLimiter:
+    """Request and token budgets refilled continuously from per-minute caps.
+
+    Mirrors the openai-cookbook parallel-processor pattern: a call proceeds
+    only when both a request slot and its estimated token cost are available,
+    keeping sustained throughput just under the account's RPM/TPM limits
+    instead of bouncing off 429s.
+    """
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        self.max_rpm = max_requests_per_minute
+        self.max_tpm = max_tokens_per_minute
+        self._request_capacity = float(max_requests_per_minute)
+        self._token_capacity = float(max_tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, token_cost: int):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last_refill
+                self._request_capacity = min(
+                    float(self.max_rpm), self._request_capacity + self.max_rpm * elapsed / 60
+                )
+                self._token_capacity = min(
+                    float(self.max_tpm), self._token_capacity + self.max_tpm * elapsed / 60
+                )
+                self._last_refill = now
+                if self._request_capacity >= 1 and self._token_capacity >= token_cost:
+                    self._request_capacity -= 1
+                    self._token_capacity -= token_cost
+                    return
+            await asyncio.sleep(0.1)
+
+rate_limiter = TokenBucketLimiter(
+    max_requests_per_minute=int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "500")),
+    max_tokens_per_minute=int(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "150000"))
+)
+
+class CircuitBreaker:
+    """Fail fast when OpenAI looks unhealthy instead of piling up requests.
+
+    Opens after fail_max consecutive failures. While open, calls are rejected
+    immediately with 503 until reset_timeout elapses, after which trial calls
+    are let through; a success closes the breaker, a failure re-opens it.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: int = 30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info("OpenAI circuit breaker closed")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            if self._opened_at is None:
+                logger.warning(
+                    f"OpenAI circuit breaker opened after {self._failures} consecutive failures"
+                )
+            self._opened_at = time.monotonic()
+
+circuit_breaker = CircuitBreaker(
+    fail_max=int(os.getenv("OPENAI_BREAKER_FAIL_MAX", "5")),
+    reset_timeout=int(os.getenv("OPENAI_BREAKER_RESET_TIMEOUT", "30"))
+)
+
+def estimate_token_cost(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Estimate prompt + completion tokens for a chat.completions call.
+
+    Static prompts resolve to pre-computed counts; only the per-request
+    content is actually encoded.
+    """
+    total = max_tokens
+    for message in messages:
+        content = message["content"]
+        cached_count = STATIC_PROMPT_TOKEN_COUNTS.get(content)
+        total += cached_count if cached_count is not None else len(encoding.encode(content))
+    return total
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_KEY"))
+async def create_completion(**kwargs):
+    """Rate-limited, circuit-broken chat.completions.create with retry on 429s."""
+    if not circuit_breaker.allow():
+        raise HTTPException(
+            status_code=503,
+            detail="OpenAI circuit breaker is open; try again shortly"
+        )
+    await rate_limiter.acquire(
+        estimate_token_cost(kwargs["messages"], kwargs.get("max_tokens", 0))
+    )
+    for attempt in range(3):
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except RateLimitError:
+            # 429s mean we're over quota, not that the provider is down;
+            # they back off and retry without tripping the breaker. Once
+            # retries are exhausted, surface backpressure as 429 rather
+            # than letting the generic handlers turn it into a 500.
+            if attempt == 2:
+                raise HTTPException(
+                    status_code=429,
+                    detail="OpenAI rate limit exceeded after retries",
+                    headers={"Retry-After": "5"}
+                )
+            delay = 2 ** attempt + random.random()
+            logger.warning(f"Rate limited by OpenAI; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except Exception:
+            circuit_breaker.record_failure()
+            raise
+        else:
+            circuit_breaker.record_success()
+            return response
 
+# Static instructions sent as the first message on every analysis call.
+# Kept above OpenAI's 1024-token automatic prompt-caching threshold and
+# byte-identical across requests so the prefix hash stays stable; anything
+# per-request (instrument, articles) belongs in the trailing user message.
 SYSTEM_PROMPT = """You are a financial news analyst. Analyze the provided news articles and create a concise but comprehensive market analysis. Focus on the potential impact on trading decisions.
 
 Your analysis should follow this format:
@@ -53,36 +231,225 @@ Remember:
 - Keep each point concise
 - Add a space between sections
 - Use * for emphasis instead of #
-- Format numbers clearly (1.2350 instead of 1.235)"""
+- Format numbers clearly (1.2350 instead of 1.235)
+
+Detailed section guidance:
+
+Market Impact Analysis:
+- Lead with the single most market-moving item from the articles, not the most recent one. Central bank decisions, surprise macro prints, and regulatory actions outrank scheduled earnings or routine commentary.
+- When articles conflict, say so explicitly and state which source you weight more heavily and why (official statements over secondary reporting, primary data over analyst opinion).
+- Quantify wherever the articles allow: cite the actual figure, the consensus expectation, and the surprise. "CPI came in at 3.1% versus 3.4% expected" is useful; "inflation was lower" is not.
+- Anchor each point to the instrument being analyzed. A rate decision matters differently for a currency pair than for an equity index; draw that line for the reader.
+
+Market Sentiment:
+- Direction must be exactly one of Bullish, Bearish, or Neutral. Do not hedge with compound labels like "cautiously bullish" - use the Strength field to express conviction instead.
+- Strength must be exactly one of Strong, Moderate, or Weak, and should reflect both how one-sided the news flow is and how reliable the sources are.
+- The key driver line should name the single dominant factor. If two factors genuinely tie, pick the one with the longer-lasting effect.
+- Sentiment describes the likely market reaction to this news set, not your long-term fundamental view of the instrument.
+
+Trading Implications:
+- The short-term outlook covers roughly the next one to five trading sessions. Do not extrapolate beyond what the news supports.
+- Risk assessment (High/Medium/Low) reflects event risk and expected volatility, not directional conviction. A high-conviction bullish setup into a central bank meeting is still High risk.
+- Quote key levels only when the articles reference them or they are widely watched round numbers. Never invent precise levels without support.
+- Frame implications as conditions, not commands: "a close above 1.0950 would confirm" rather than "buy at 1.0950".
+
+Risk Factors:
+- List exactly three, ordered from most to least probable.
+- Each risk must be specific and falsifiable: a named event, data release, or decision with a direction of impact. "Market volatility" and "uncertainty" are not acceptable entries.
+- At least one risk should run counter to the stated sentiment direction, so the reader sees what would invalidate the view.
+- Include timing when known: "Friday's payrolls release" beats "upcoming data".
+
+Source handling:
+- Treat undated or unsourced articles with reduced weight and note it when they drive a conclusion.
+- If the article set is stale relative to a known later development, flag the staleness rather than analyzing as if current.
+- Never fabricate facts, figures, or events that are not present in the provided articles; if the articles are insufficient for a section, say so plainly in that section.
+
+Formatting recap:
+- Keep the four section headers exactly as given: Market Impact Analysis, Market Sentiment, Trading Implications, Risk Factors. Downstream parsing depends on them.
+- Bullets start with "• " and hold one idea each; no nested bullets, no numbered lists inside sections.
+- Prices and rates keep full precision as quoted (1.2350, 4.625%); large figures use short forms (1.2B, 350K).
+- No preamble before the first section and no sign-off after the last; the analysis starts and ends with the sections.
+
+Instrument conventions:
+- Currency pairs are quoted base/quote (EURUSD means euros priced in dollars); bullish always refers to the base currency strengthening against the quote. State moves in pips for FX and points for indices.
+- For commodities and metals, distinguish spot from futures commentary when the articles mix them, and note the contract month if one is named.
+- For equities and indices, separate single-name news from index-level drivers; an earnings beat on one constituent is not an index thesis on its own.
+- For crypto instruments, treat exchange-specific outages, regulatory actions, and ETF-flow stories as first-class drivers alongside macro factors.
+- If the instrument symbol is unfamiliar or ambiguous, analyze it based on how the articles themselves treat it and say which interpretation you used.
+
+Bullet quality standards:
+- A good bullet pairs a fact with its consequence: "ECB cut the deposit rate 25bp to 3.25%, keeping rate differentials moving against the euro." A weak bullet states only one half of that pair.
+- Never restate the same point in two sections with different wording; each section must add information the previous ones did not carry.
+- Avoid hedged filler such as "time will tell", "markets remain uncertain", or "traders should stay cautious"; every line must be something a reader could act on or verify.
+- Attribute views: "Goldman expects" or "the Fed minutes suggest" rather than an unattributed "it is expected".
+- Prefer the concrete number over the adjective: "fell 1.8%" beats "fell sharply" whenever the articles provide the figure.
+
+Consistency rules:
+- The Market Sentiment direction must be consistent with the balance of the Market Impact bullets; if impact bullets lean bearish, do not label sentiment Bullish without explicitly reconciling the tension.
+- The Trading Implications outlook must follow from the stated sentiment and strength, and the Risk Factors must name what would break that outlook.
+- When the article set is mixed or thin, prefer Neutral with Weak or Moderate strength over forcing a directional call; a forced verdict is worse than an honest neutral.
+- Use identical terminology for the same concept throughout one analysis (pick "rate cut" or "easing", not both interchangeably)."""
+
+# Token counts for the static prompts, computed once at import so the rate
+# limiter's estimator doesn't re-encode ~1K tokens of instructions per call.
+SYSTEM_PROMPT_TOKENS = encoding.encode(SYSTEM_PROMPT)
+SYSTEM_PROMPT_TOKEN_COUNT = len(SYSTEM_PROMPT_TOKENS)
+STATIC_PROMPT_TOKEN_COUNTS = {
+    SYSTEM_PROMPT: SYSTEM_PROMPT_TOKEN_COUNT,
+    VERDICT_SYSTEM_PROMPT: len(encoding.encode(VERDICT_SYSTEM_PROMPT)),
+    CONTEXT_SYSTEM_PROMPT: len(encoding.encode(CONTEXT_SYSTEM_PROMPT)),
+}
+
+# Below 1024 tokens the prefix gets no automatic caching and the extra
+# guidance is pure cost, so catch any edit that shrinks it back under.
+if SYSTEM_PROMPT_TOKEN_COUNT < 1024:
+    logger.warning(
+        f"SYSTEM_PROMPT is only {SYSTEM_PROMPT_TOKEN_COUNT} tokens, under the 1024-token "
+        "prompt-caching threshold; repeated requests will pay full input price"
+    )
+else:
+    logger.info(
+        f"SYSTEM_PROMPT is {SYSTEM_PROMPT_TOKEN_COUNT} tokens; prompt-prefix caching eligible"
+    )
 
 class NewsRequest(BaseModel):
     instrument: str
     articles: List[Dict[str, Any]]
+    stream: bool = False
 
-@app.post("/analyze-news")
-def analyze_news(request: NewsRequest):
-    """Analyze news articles and provide sentiment analysis."""
-    try:
-        # Create a prompt for news analysis
-        articles_text = "\n\n".join([
-            f"Title: {article.get('title', 'No Title')}\n"
-            f"Content: {article.get('content', 'No Content')}\n"
-            f"Source: {article.get('source', 'Unknown')}\n"
-            f"Date: {article.get('date', 'Unknown')}"
-            for article in request.articles
-        ])
-        
-        prompt = f"""Analyze these news articles about {request.instrument} and provide a concise market analysis.
+class BatchNewsRequest(BaseModel):
+    requests: List[NewsRequest]
 
-News Articles:
-{articles_text}
+class ContextRequest(BaseModel):
+    instrument: str
+
+# How long /analyze-news-batch waits for the OpenAI batch before giving up
+BATCH_POLL_TIMEOUT = int(os.getenv("BATCH_POLL_TIMEOUT", "3600"))
+
+class ResponseCache:
+    """TTL cache for endpoint responses.
+
+    Backed by Redis when REDIS_URL is set (shared across workers), with a
+    process-local dict fallback so caching works without extra infrastructure.
+    Values are stored as JSON. Cache problems never fail a request: Redis
+    errors are logged and treated as misses, and the local dict sweeps
+    expired entries and is capped at max_entries so distinct article-set
+    digests can't grow it without bound.
+    """
+
+    def __init__(self, ttl: int, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local: Dict[str, Any] = {}
+        self._redis = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("REDIS_URL is set but the redis package is not installed; using in-process cache")
+
+    async def get(self, key: str):
+        if self._redis is not None:
+            try:
+                cached = await self._redis.get(key)
+                return orjson.loads(cached) if cached else None
+            except Exception as e:
+                logger.warning(f"Redis get failed ({e}); treating as cache miss")
+                return None
+        entry = self._local.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        self._local.pop(key, None)
+        return None
+
+    async def set(self, key: str, value):
+        if self._redis is not None:
+            try:
+                await self._redis.setex(key, self.ttl, orjson.dumps(value))
+            except Exception as e:
+                logger.warning(f"Redis set failed ({e}); skipping cache write")
+            return
+        now = time.monotonic()
+        if len(self._local) >= self.max_entries:
+            for stale_key in [k for k, (expires, _) in self._local.items() if expires <= now]:
+                del self._local[stale_key]
+        if len(self._local) >= self.max_entries:
+            # Still full after dropping expired entries: evict whichever
+            # entry expires soonest to make room.
+            del self._local[min(self._local, key=lambda k: self._local[k][0])]
+        self._local[key] = (now + self.ttl, value)
 
-Format your response according to the following guidelines:
-{SYSTEM_PROMPT}"""
+response_cache = ResponseCache(
+    ttl=int(os.getenv("RESPONSE_CACHE_TTL", "600")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+)
 
-        # Call OpenAI API for analysis
-        analysis_response = client.chat.completions.create(
-            model="gpt-4-0125-preview",
+def news_cache_key(request: NewsRequest) -> str:
+    """Cache key for an analyze-news request: instrument + sorted article set."""
+    digest = hashlib.sha256(request.instrument.encode("utf-8"))
+    for part in sorted(f"{a.get('title', '')}{a.get('date', '')}" for a in request.articles):
+        digest.update(b"\x00")
+        digest.update(part.encode("utf-8"))
+    return f"analyze-news:{digest.hexdigest()}"
+
+class AnalysisBatcher:
+    """Coalesce concurrent analysis prompts into a single OpenAI call.
+
+    Prompts arriving within max_wait_ms of each other are combined into one
+    chat.completions request with numbered delimiters; the segmented response
+    is split back out to each waiting caller. This amortizes per-request RTT
+    and RPM budget during bulk symbol scans. A full batch flushes immediately.
+    """
+
+    def __init__(self, max_batch: int = 8, max_wait_ms: int = 200):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker = None
+
+    async def submit(self, prompt: str) -> str:
+        """Enqueue a prompt and wait for its analysis text."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._drain())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            if len(batch) == 1:
+                results = [await self._complete(batch[0][0])]
+            else:
+                results = await self._complete_batch([prompt for prompt, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _complete(self, prompt: str) -> str:
+        response = await create_completion(
+            model=ANALYSIS_MODEL,
             messages=[{
                 "role": "system",
                 "content": SYSTEM_PROMPT
@@ -93,44 +460,266 @@ Format your response according to the following guidelines:
             temperature=0.5,
             max_tokens=1000
         )
-        
-        # Get a specific trading verdict
-        verdict_prompt = f"""Based on the news analysis, provide a clear trading verdict for {request.instrument}.
-        Previous analysis: {analysis_response.choices[0].message.content}
-        
+        return response.choices[0].message.content
+
+    async def _complete_batch(self, prompts: List[str]) -> List[str]:
+        combined = "\n\n".join(
+            f"### REQUEST {i + 1}\n{prompt}" for i, prompt in enumerate(prompts)
+        )
+        batch_prompt = f"""You will receive {len(prompts)} independent analysis requests, each marked "### REQUEST <number>".
+Answer every request separately, starting each answer with "### RESPONSE <number>" on its own line, in the same order.
+
+{combined}"""
+        response = await create_completion(
+            model=ANALYSIS_MODEL,
+            messages=[{
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            }, {
+                "role": "user",
+                "content": batch_prompt
+            }],
+            temperature=0.5,
+            # gpt-4-0125-preview caps completions at 4096 tokens; requesting
+            # more gets the whole batch rejected with a 400.
+            max_tokens=min(1000 * len(prompts), 4096)
+        )
+        segments = re.split(r"###\s*RESPONSE\s*\d+\s*\n?", response.choices[0].message.content)
+        segments = [segment.strip() for segment in segments if segment.strip()]
+        if len(segments) != len(prompts):
+            # A malformed combined response shouldn't fail every caller in
+            # the batch; redo the prompts individually instead.
+            logger.warning(
+                f"Batched response had {len(segments)} segments for {len(prompts)} requests; "
+                "retrying prompts individually"
+            )
+            return await asyncio.gather(*(self._complete(prompt) for prompt in prompts))
+        return segments
+
+analysis_batcher = AnalysisBatcher(
+    max_batch=int(os.getenv("ANALYSIS_BATCH_SIZE", "8")),
+    max_wait_ms=int(os.getenv("ANALYSIS_BATCH_WAIT_MS", "200"))
+)
+
+# Token budgets for the analysis prompt: latency scales with prompt length,
+# so long articles are truncated and the article list is capped overall.
+ARTICLE_TOKEN_LIMIT = int(os.getenv("ARTICLE_TOKEN_LIMIT", "500"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
+def build_analysis_prompt(request: NewsRequest) -> str:
+    """Build the news analysis prompt for a request.
+
+    Each article's content is truncated to ARTICLE_TOKEN_LIMIT tokens and no
+    further articles are added once the combined text would exceed
+    PROMPT_TOKEN_BUDGET, so one oversized article set can't blow past the
+    context window or dominate latency.
+    """
+    blocks = []
+    used_tokens = 0
+    for i, article in enumerate(request.articles):
+        content = article.get('content', 'No Content')
+        content_tokens = encoding.encode(content)
+        if len(content_tokens) > ARTICLE_TOKEN_LIMIT:
+            content = encoding.decode(content_tokens[:ARTICLE_TOKEN_LIMIT]) + "…"
+        block = (
+            f"Title: {article.get('title', 'No Title')}\n"
+            f"Content: {content}\n"
+            f"Source: {article.get('source', 'Unknown')}\n"
+            f"Date: {article.get('date', 'Unknown')}"
+        )
+        block_tokens = len(encoding.encode(block))
+        if used_tokens + block_tokens > PROMPT_TOKEN_BUDGET:
+            logger.info(
+                f"Prompt token budget reached for {request.instrument}; "
+                f"dropping {len(request.articles) - i} of {len(request.articles)} articles"
+            )
+            break
+        used_tokens += block_tokens
+        blocks.append(block)
+    articles_text = "\n\n".join(blocks)
+
+    # The formatting guidelines already travel as the system message on every
+    # call; repeating SYSTEM_PROMPT here doubled input tokens per request.
+    return f"""Analyze these news articles about {request.instrument} and provide a concise market analysis.
+
+News Articles:
+{articles_text}"""
+
+def build_market_context_prompt(instrument: str) -> str:
+    """Build the market context prompt for an instrument."""
+    return f"""Provide a brief market context analysis for {instrument}. Consider:
+        1. Related instruments and their performance
+        2. Key market drivers
+        3. Important technical levels
+        4. Upcoming economic events that might impact the instrument
+
+        Format your response in a clear, concise way."""
+
+# Five-class verdict from the analysis's mandated Direction/Strength labels
+LOCAL_VERDICT_MAP = {
+    ("bullish", "strong"): "STRONG_BUY",
+    ("bullish", "moderate"): "BUY",
+    ("bearish", "strong"): "STRONG_SELL",
+    ("bearish", "moderate"): "SELL",
+}
+LOCAL_CONFIDENCE_MAP = {"strong": 85, "moderate": 70}
+
+DIRECTION_RE = re.compile(r"direction:\s*\**\s*(bullish|bearish|neutral)", re.IGNORECASE)
+STRENGTH_RE = re.compile(r"strength:\s*\**\s*(strong|moderate|weak)", re.IGNORECASE)
+KEY_DRIVER_RE = re.compile(r"key driver:\s*\**\s*(.+)", re.IGNORECASE)
+
+def local_verdict(analysis_text: str) -> Optional[Dict[str, Any]]:
+    """Derive the trading verdict from the analysis text without an LLM call.
+
+    The analysis format mandates exact Direction and Strength labels in the
+    Market Sentiment section, so a rule-based read resolves the five-class
+    verdict in microseconds instead of a second network round-trip. Returns
+    None when the labels are missing or the signal is weak, in which case the
+    caller falls back to the LLM.
+    """
+    direction_match = DIRECTION_RE.search(analysis_text)
+    strength_match = STRENGTH_RE.search(analysis_text)
+    if not direction_match or not strength_match:
+        return None
+    direction = direction_match.group(1).lower()
+    strength = strength_match.group(1).lower()
+
+    driver_match = KEY_DRIVER_RE.search(analysis_text)
+    key_reason = driver_match.group(1).strip() if driver_match else "Derived from market sentiment"
+
+    if direction == "neutral":
+        return {"verdict": "NEUTRAL", "confidence": 60, "key_reason": key_reason}
+    if strength == "weak":
+        # Weak signal: below confidence threshold, defer to the LLM
+        return None
+    return {
+        "verdict": LOCAL_VERDICT_MAP[(direction, strength)],
+        "confidence": LOCAL_CONFIDENCE_MAP[strength],
+        "key_reason": key_reason
+    }
+
+async def get_verdict(instrument: str, analysis_text: str) -> Dict[str, Any]:
+    """Get a structured trading verdict for an analysis.
+
+    Tries the local rule-based classifier first and only spends an LLM call
+    when the analysis doesn't carry a clear sentiment signal.
+    """
+    verdict = local_verdict(analysis_text)
+    if verdict is not None:
+        return verdict
+    verdict_prompt = f"""Based on the news analysis, provide a clear trading verdict for {instrument}.
+        Previous analysis: {analysis_text}
+
         Format your response as a JSON with these fields:
         - verdict: (STRONG_BUY, BUY, NEUTRAL, SELL, STRONG_SELL)
         - confidence: (percentage between 0-100)
         - key_reason: (brief explanation)"""
-        
-        verdict_response = client.chat.completions.create(
-            model="gpt-4-0125-preview",
+
+    # The verdict is a small JSON extraction; a mini model in JSON mode
+    # is several times faster and cheaper than gpt-4 and parses reliably.
+    verdict_response = await create_completion(
+        model=VERDICT_MODEL,
+        messages=[{
+            "role": "system",
+            "content": VERDICT_SYSTEM_PROMPT
+        }, {
+            "role": "user",
+            "content": verdict_prompt
+        }],
+        response_format={"type": "json_object"},
+        temperature=0.3,
+        max_tokens=150
+    )
+
+    try:
+        return orjson.loads(verdict_response.choices[0].message.content)
+    except orjson.JSONDecodeError:
+        # If the response is not valid JSON, create a structured response
+        return {
+            "verdict": "NEUTRAL",
+            "confidence": 50,
+            "key_reason": "Could not parse verdict response"
+        }
+
+async def stream_analysis(request: NewsRequest):
+    """Yield analysis tokens as SSE events, then a final verdict event.
+
+    The analysis text is buffered while it streams to the client so the
+    verdict call can start the moment the stream closes, instead of the
+    client seeing nothing until both completions finish.
+    """
+    try:
+        stream = await create_completion(
+            model=ANALYSIS_MODEL,
             messages=[{
                 "role": "system",
-                "content": "You are a trading advisor that provides clear, decisive trading verdicts based on news analysis."
+                "content": SYSTEM_PROMPT
             }, {
                 "role": "user",
-                "content": verdict_prompt
+                "content": build_analysis_prompt(request)
             }],
-            temperature=0.3,
-            max_tokens=200
+            temperature=0.5,
+            max_tokens=1000,
+            stream=True
         )
-        
+        buffered = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                buffered.append(delta)
+                yield b"data: " + orjson.dumps({"analysis": delta}) + b"\n\n"
+
+        verdict_json = await get_verdict(request.instrument, "".join(buffered))
+        logger.info(f"Successfully streamed analysis for {request.instrument}")
+        yield b"event: verdict\ndata: " + orjson.dumps(verdict_json) + b"\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming analysis: {str(e)}")
+        yield b"event: error\ndata: " + orjson.dumps({"detail": str(e)}) + b"\n\n"
+
+@app.post("/analyze-news")
+async def analyze_news(request: NewsRequest):
+    """Analyze news articles and provide sentiment analysis."""
+    try:
+        # Streaming requests bypass the batcher and response cache: tokens
+        # are forwarded to the client as they arrive from OpenAI.
+        if request.stream:
+            return StreamingResponse(stream_analysis(request), media_type="text/event-stream")
+
+        cache_key = news_cache_key(request)
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for {request.instrument}")
+            return cached
+
+        prompt = build_analysis_prompt(request)
+
+        # The analysis and market context calls are independent, so issue
+        # them concurrently instead of paying two sequential round-trips.
+        # The analysis goes through the batcher so concurrent requests
+        # share a single OpenAI call.
+        ai_response, context_response = await asyncio.gather(
+            analysis_batcher.submit(prompt),
+            create_completion(
+                model=ANALYSIS_MODEL,
+                messages=[{
+                    "role": "system",
+                    "content": CONTEXT_SYSTEM_PROMPT
+                }, {
+                    "role": "user",
+                    "content": build_market_context_prompt(request.instrument)
+                }],
+                temperature=0.5,
+                max_tokens=500
+            )
+        )
+
+        # Get a specific trading verdict
+        verdict_json = await get_verdict(request.instrument, ai_response)
+
         logger.info(f"Successfully analyzed news for {request.instrument}")
-        
-        try:
-            verdict_json = json.loads(verdict_response.choices[0].message.content)
-        except json.JSONDecodeError:
-            # If the response is not valid JSON, create a structured response
-            verdict_json = {
-                "verdict": "NEUTRAL",
-                "confidence": 50,
-                "key_reason": "Could not parse verdict response"
-            }
-        
-        # Parse the OpenAI response into sections
-        ai_response = analysis_response.choices[0].message.content
-        
+
         # Extract sections from AI response
         sections = {}
         current_section = None
@@ -177,33 +766,116 @@ Format your response according to the following guidelines:
 ⚠️ Risk Factors
 {sections.get('risk_factors', 'No risk factors available.')}"""
         
-        return {
+        result = {
             "status": "success",
             "analysis": analysis,
-            "verdict": verdict_json
+            "verdict": verdict_json,
+            "market_context": context_response.choices[0].message.content
         }
+        await response_cache.set(cache_key, result)
+        return result
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing news: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze-news-batch")
+async def analyze_news_batch(request: BatchNewsRequest):
+    """Analyze a bulk set of news requests via the OpenAI Batch API.
+
+    Intended for non-interactive workloads (e.g. nightly instrument scans):
+    batched requests cost half the synchronous price and don't consume
+    synchronous rate limits, at the expense of latency.
+    """
+    try:
+        lines = []
+        for i, item in enumerate(request.requests):
+            lines.append(orjson.dumps({
+                "custom_id": f"{item.instrument}-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": ANALYSIS_MODEL,
+                    "messages": [{
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    }, {
+                        "role": "user",
+                        "content": build_analysis_prompt(item)
+                    }],
+                    "temperature": 0.5,
+                    "max_tokens": 1000
+                }
+            }))
+
+        batch_file = await client.files.create(
+            file=("analyses.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+
+        # Poll with exponential backoff until the batch reaches a terminal state
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BATCH_POLL_TIMEOUT
+        delay = 2
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if loop.time() >= deadline:
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Batch {batch.id} still {batch.status} after {BATCH_POLL_TIMEOUT}s"
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+            batch = await client.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise HTTPException(
+                status_code=502,
+                detail=f"Batch {batch.id} ended with status {batch.status}"
+            )
+
+        output = await client.files.content(batch.output_file_id)
+        results = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            results[record["custom_id"]] = record["response"]["body"]["choices"][0]["message"]["content"]
+
+        logger.info(f"Batch {batch.id} completed with {len(results)} results")
+        return {"status": "success", "batch_id": batch.id, "results": results}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running batch analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/get-market-context")
-def get_market_context(instrument: str):
+async def get_market_context(request: ContextRequest):
     """Get broader market context and potential correlations."""
     try:
-        prompt = f"""Provide a brief market context analysis for {instrument}. Consider:
-        1. Related instruments and their performance
-        2. Key market drivers
-        3. Important technical levels
-        4. Upcoming economic events that might impact the instrument
-        
-        Format your response in a clear, concise way."""
+        instrument = request.instrument
+        cache_key = f"market-context:{instrument}"
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for market context on {instrument}")
+            return cached
+
+        prompt = build_market_context_prompt(instrument)
 
-        response = client.chat.completions.create(
-            model="gpt-4-0125-preview",
+        response = await create_completion(
+            model=ANALYSIS_MODEL,
             messages=[{
                 "role": "system",
-                "content": "You are a market analyst providing context and correlation analysis for trading instruments."
+                "content": CONTEXT_SYSTEM_PROMPT
             }, {
                 "role": "user",
                 "content": prompt
@@ -213,12 +885,24 @@ def get_market_context(instrument: str):
         )
         
         logger.info(f"Successfully got market context for {instrument}")
-        return {"market_context": response.choices[0].message.content}
+        result = {"market_context": response.choices[0].message.content}
+        await response_cache.set(cache_key, result)
+        return result
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting market context: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8080,
+        workers=(os.cpu_count() or 2),
+        loop="uvloop",
+        http="httptools",
+        log_level="info"
+    )